@@ -1,48 +1,103 @@
 from __future__ import annotations
 
-import json
+import http.client
 import time
-import urllib.request
-from typing import Any, Dict, List
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
 
+import fastjson
 import scenarios
 
-
-def _post_json(payload: Dict[str, Any], endpoint: str, timeout: int) -> Dict[str, Any]:
-    data = json.dumps(payload, ensure_ascii=True).encode("utf-8")
-    req = urllib.request.Request(
-        endpoint, data=data, headers={"Content-Type": "application/json"}, method="POST"
-    )
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8"))
-
-
-def _prune_old_screenshots(messages: List[Dict[str, Any]], keep_last: int) -> List[Dict[str, Any]]:
-    idxs = []
-    for i, m in enumerate(messages):
-        if m.get("role") != "user":
+# Pool for running model-requested parallel tool calls concurrently.
+_TOOL_POOL = ThreadPoolExecutor(max_workers=4)
+
+# Parsed endpoints and open connections, reused across agent steps so each
+# POST does not pay TCP setup again.
+_url_cache: Dict[str, urllib.parse.ParseResult] = {}
+_conn_cache: Dict[Tuple[str, int, str], http.client.HTTPConnection] = {}
+
+
+def _get_connection(parsed: urllib.parse.ParseResult, timeout: int) -> http.client.HTTPConnection:
+    host = parsed.hostname or "localhost"
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    key = (host, port, parsed.scheme)
+    conn = _conn_cache.get(key)
+    if conn is None:
+        conn_cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        conn = conn_cls(host, port, timeout=timeout)
+        _conn_cache[key] = conn
+    return conn
+
+
+def _drop_connection(parsed: urllib.parse.ParseResult) -> None:
+    host = parsed.hostname or "localhost"
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    conn = _conn_cache.pop((host, port, parsed.scheme), None)
+    if conn is not None:
+        conn.close()
+
+
+def _post_json(data: bytes, endpoint: str, timeout: int) -> Dict[str, Any]:
+    parsed = _url_cache.get(endpoint)
+    if parsed is None:
+        parsed = urllib.parse.urlparse(endpoint)
+        _url_cache[endpoint] = parsed
+    path = parsed.path or "/"
+    if parsed.query:
+        path += "?" + parsed.query
+    headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+
+    for attempt in range(2):
+        conn = _get_connection(parsed, timeout)
+        try:
+            conn.request("POST", path, body=data, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.BadStatusLine, http.client.RemoteDisconnected, ConnectionError, BrokenPipeError):
+            # Server closed the idle keep-alive socket; reconnect once.
+            _drop_connection(parsed)
+            if attempt == 1:
+                raise
             continue
-        c = m.get("content")
-        if not isinstance(c, list):
-            continue
-        if any(isinstance(p, dict) and p.get("type") == "image_url" for p in c):
-            idxs.append(i)
-
-    if len(idxs) <= keep_last:
-        return messages
-
-    for i in idxs[:-keep_last]:
-        file_hint = ""
-        if i > 0 and messages[i - 1].get("role") == "tool":
-            try:
-                meta = json.loads(messages[i - 1].get("content", "{}"))
-                if isinstance(meta, dict) and meta.get("ok") and meta.get("file"):
-                    file_hint = f" (omitted; file={meta['file']})"
-            except Exception:
-                pass
-        messages[i]["content"] = f"captured image data{file_hint}"
-
-    return messages
+        if resp.status >= 400:
+            # Error bodies are HTML or JSON error objects, not completions;
+            # surface the status line rather than failing downstream parsing.
+            snippet = body[:200].decode("utf-8", errors="replace")
+            raise RuntimeError(f"HTTP {resp.status} {resp.reason} from {endpoint}: {snippet}")
+        return fastjson.loads(body)
+
+
+def _collapse_tool_content(messages: List[Dict[str, Any]], idx: int) -> None:
+    """Shrink an old tool result to a stub, keeping any file reference.
+
+    The message itself stays in place so the assistant's tool_call_id
+    pairing remains valid for the API.
+    """
+    m = messages[idx]
+    meta = None
+    try:
+        meta = fastjson.loads(m.get("content", "{}"))
+    except Exception:
+        pass
+    stub: Dict[str, Any] = {"ok": bool(meta.get("ok")) if isinstance(meta, dict) else False, "omitted": True}
+    if isinstance(meta, dict) and meta.get("file"):
+        stub["file"] = meta["file"]
+    m["content"] = fastjson.dumps_str(stub)
+
+
+def _omit_image_content(messages: List[Dict[str, Any]], idx: int) -> None:
+    """Replace a pruned screenshot message's content with a file reference."""
+    file_hint = ""
+    if idx > 0 and messages[idx - 1].get("role") == "tool":
+        try:
+            meta = fastjson.loads(messages[idx - 1].get("content", "{}"))
+            if isinstance(meta, dict) and meta.get("ok") and meta.get("file"):
+                file_hint = f" (omitted; file={meta['file']})"
+        except Exception:
+            pass
+    messages[idx]["content"] = f"captured image data{file_hint}"
 
 
 def run_agent(
@@ -57,6 +112,7 @@ def run_agent(
     temperature = cfg["temperature"]
     max_tokens = cfg["max_tokens"]
     keep_last_screenshots = cfg["keep_last_screenshots"]
+    keep_last_tool_results = cfg["keep_last_tool_results"]
     max_steps = cfg["max_steps"]
     step_delay = cfg["step_delay"]
 
@@ -74,21 +130,35 @@ def run_agent(
         {"role": "user", "content": task_prompt},
     ]
 
+    # The model id, system message, tools schema and sampling parameters
+    # never change between steps; serialize them once and splice the
+    # per-step message tail in between.
+    body_prefix = (
+        b'{"model":' + fastjson.dumps(model_id)
+        + b',"messages":[' + fastjson.dumps(messages[0]) + b","
+    )
+    body_suffix = (
+        b',"tools":' + fastjson.dumps(tools_schema)
+        + b',"tool_choice":"auto","temperature":' + fastjson.dumps(temperature)
+        + b',"max_tokens":' + fastjson.dumps(max_tokens) + b"}"
+    )
+
+    # Indices of screenshot-bearing user messages and of tool results,
+    # oldest first, so pruning does not rescan the whole history every step.
+    image_msg_indices: deque[int] = deque()
+    tool_msg_indices: deque[int] = deque()
+
     last_content = ""
 
+    # Monotonic deadline after which the previous step's input events have
+    # settled; the LLM round-trip normally covers it for free.
+    tools_ready_at = 0.0
+
     for _ in range(max_steps):
-        resp = _post_json(
-            {
-                "model": model_id,
-                "messages": messages,
-                "tools": tools_schema,
-                "tool_choice": "auto",
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-            },
-            endpoint,
-            timeout,
-        )
+        # dumps(messages[1:]) yields b"[...]"; drop its "[" so the tail
+        # continues the array opened in body_prefix.
+        data = body_prefix + fastjson.dumps(messages[1:])[1:] + body_suffix
+        resp = _post_json(data, endpoint, timeout)
 
         msg = resp["choices"][0]["message"]
         messages.append(msg)
@@ -100,32 +170,47 @@ def run_agent(
         if not tool_calls:
             return last_content
 
-        if len(tool_calls) > 1:
-            for extra_tc in tool_calls[1:]:
-                messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": extra_tc["id"],
-                        "name": extra_tc["function"]["name"],
-                        "content": scenarios._err_payload(
-                            "too_many_tool_calls", "only one tool call per response allowed"
-                        ),
-                    }
+        remaining = tools_ready_at - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+        # Execute tool calls via scenarios module; when the model emits
+        # several in one response, run them concurrently and append the
+        # results in the order they were requested.
+        if len(tool_calls) == 1:
+            tc = tool_calls[0]
+            results = [
+                scenarios.execute_tool(
+                    tc["function"]["name"], tc["function"].get("arguments"), tc["id"], dump_cfg
+                )
+            ]
+        else:
+            futures = [
+                _TOOL_POOL.submit(
+                    scenarios.execute_tool,
+                    tc["function"]["name"],
+                    tc["function"].get("arguments"),
+                    tc["id"],
+                    dump_cfg,
                 )
-            tool_calls = tool_calls[:1]
-
-        tc = tool_calls[0]
-        name = tc["function"]["name"]
-        arg_str = tc["function"].get("arguments")
-        call_id = tc["id"]
-
-        # Execute tool via scenarios module
-        tool_msg, user_msg = scenarios.execute_tool(name, arg_str, call_id, dump_cfg)
-        messages.append(tool_msg)
-        
-        if user_msg is not None:
-            messages.append(user_msg)
-            messages = _prune_old_screenshots(messages, keep_last_screenshots)
+                for tc in tool_calls
+            ]
+            results = [f.result() for f in futures]
+
+        for tool_msg, user_msg, ready_at in results:
+            messages.append(tool_msg)
+            tool_msg_indices.append(len(messages) - 1)
+            if ready_at > tools_ready_at:
+                tools_ready_at = ready_at
+            if user_msg is not None:
+                messages.append(user_msg)
+                image_msg_indices.append(len(messages) - 1)
+
+        while len(image_msg_indices) > keep_last_screenshots:
+            _omit_image_content(messages, image_msg_indices.popleft())
+
+        while len(tool_msg_indices) > keep_last_tool_results:
+            _collapse_tool_content(messages, tool_msg_indices.popleft())
 
         time.sleep(step_delay)
 
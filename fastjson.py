@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import json as _stdlib_json
+from typing import Any
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+# Both orjson.JSONDecodeError and json.JSONDecodeError derive from ValueError
+# and expose .msg, so callers can catch one name regardless of backend.
+JSONDecodeError = _orjson.JSONDecodeError if _orjson is not None else _stdlib_json.JSONDecodeError
+
+
+if _orjson is not None:
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize obj to compact UTF-8 JSON bytes."""
+        return _orjson.dumps(obj)
+
+    def dumps_indent(obj: Any) -> bytes:
+        """Serialize obj to 2-space-indented UTF-8 JSON bytes."""
+        return _orjson.dumps(obj, option=_orjson.OPT_INDENT_2)
+
+    def loads(data: str | bytes) -> Any:
+        """Parse JSON from a str or UTF-8 bytes."""
+        return _orjson.loads(data)
+
+else:
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize obj to compact UTF-8 JSON bytes."""
+        return _stdlib_json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def dumps_indent(obj: Any) -> bytes:
+        """Serialize obj to 2-space-indented UTF-8 JSON bytes."""
+        return _stdlib_json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def loads(data: str | bytes) -> Any:
+        """Parse JSON from a str or UTF-8 bytes."""
+        return _stdlib_json.loads(data)
+
+
+def dumps_str(obj: Any) -> str:
+    """Serialize obj to a compact JSON string."""
+    return dumps(obj).decode("utf-8")